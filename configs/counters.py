@@ -0,0 +1,93 @@
+# Standard library imports
+import asyncio
+import logging
+
+# Third party imports
+from redis.asyncio import Redis
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+# Local application imports
+from database.models import Counter
+from database.settings import get_sessionmaker
+from .constants import REDIS_PASSWORD
+
+
+# The names of the counted buttons, they are collected in Redis first.
+COUNTERS = ('apply', 'about_courses', 'about_company', 'vacancies', 'news')
+
+# How often (in seconds) the collected clicks are written into the database.
+FLUSH_INTERVAL = 30
+
+REDIS_KEY = 'reception'
+
+# The clicks which are being written into the database right now.
+    # The key is deleted only after the database transaction is committed.
+FLUSHING_KEY = 'reception:flushing'
+
+logger = logging.getLogger(__name__)
+
+# Only one flush at a time, otherwise two of them could write the same FLUSHING_KEY twice.
+_flush_lock = asyncio.Lock()
+
+# The task of "flush_periodically", it is started and stopped by the bot (see main.py).
+flush_task = None
+
+counter = Redis(
+    host='127.0.0.1',
+    db=3,
+    port=6379,
+    password=REDIS_PASSWORD
+)
+
+
+async def increment(name):
+    # Pressing a button costs one HINCRBY, the database is not touched at all.
+    if name in COUNTERS:
+        await counter.hincrby(REDIS_KEY, name, 1)
+
+
+async def flush():
+    async with _flush_lock:
+        await _flush()
+
+
+async def _flush():
+    # If the previous flush has failed its clicks are still under FLUSHING_KEY,
+        # they are written first and the new ones wait for the next flush.
+    if not await counter.exists(FLUSHING_KEY):
+        if not await counter.exists(REDIS_KEY):
+            return
+
+        # RENAME is atomic, the clicks made after it go into a new REDIS_KEY hash.
+        await counter.rename(REDIS_KEY, FLUSHING_KEY)
+
+    deltas = await counter.hgetall(FLUSHING_KEY)
+
+    # Every counter is one row which is increased in place,
+        # the missing rows are created by the same statement.
+    request = pg_insert(Counter).values(
+        [{'name': name.decode(), 'value': int(delta)} for name, delta in deltas.items()]
+    )
+    request = request.on_conflict_do_update(
+        index_elements=['name'],
+        set_={'value': Counter.value + request.excluded.value}
+    )
+
+    async with get_sessionmaker()() as session:
+        async with session.begin():
+            await session.execute(request)
+
+    await counter.delete(FLUSHING_KEY)
+
+
+async def flush_periodically():
+    while True:
+        await asyncio.sleep(FLUSH_INTERVAL)
+
+        # One failed flush must not stop the next ones,
+            # the clicks are kept in Redis and written next time.
+        # "shield" lets a flush which has already started finish even if the task is cancelled.
+        try:
+            await asyncio.shield(flush())
+        except Exception:
+            logger.exception('Failed to write the clicks into the database')
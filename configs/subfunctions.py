@@ -1,40 +1,42 @@
 
 from sqlalchemy import update, insert
 from sqlalchemy.future import select
-from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import raiseload
 
 from buttons.inlines_buttons import ActiveVacancies
-from database.models import Vacancy
-from database.settings import engine
+from database.models import Department, Vacancy, VacancyType
+from database.settings import get_sessionmaker
 
 
-async def increment_at_reception(model, call):
-    # Only one operation under sessionb.begin() is allowed.
-        # If You want make one more request to Database,
-        # just make with session.execute().
-    async with AsyncSession(engine) as session:
-        async with session.begin():
+# All the departments by their id. It is filled once at startup by "load_departments",
+    # so handlers do not have to query the database for a department.
+DEPARTMENTS = {}
+
 
-            # After we get "callback_data" value we extract the same attribute from Reception object,
-                # as the callback_data and attribute have the same names.
-            attr = getattr(model, call.data)
+async def load_departments():
+    async with get_sessionmaker()() as session:
+        async with session.begin():
+            result = await session.execute(select(Department))
 
-            applies = select(attr)
-            request = await session.execute(applies)
+            DEPARTMENTS.clear()
+            DEPARTMENTS.update(
+                {department.id: department for department in result.scalars()}
+            )
 
-            clicks = request.scalars().first()
 
-            # We can update values by passing them as a dictionary
-            incrementation = update(model).values({call.data: clicks+1})
-            await session.execute(incrementation)
-            
+def department_by_name(department_name):
+    for department in DEPARTMENTS.values():
+        if department.department_name == department_name:
+            return department
 
+    return None
 
 
-async def object_exists(model, attr_name, attr_value, *args):
-    # "expire_on_commit" allows to continue to store data even after the session is closed.
+async def object_exists(model, attr_name, attr_value, *args, options=()):
+    # Sessions are created with "expire_on_commit=False" (see database.settings),
+    # which allows to continue to store data even after the session is closed.
     # So as we use Context Manager the session will be closed in any case.
-    async with AsyncSession(engine, expire_on_commit=False) as session:
+    async with get_sessionmaker()() as session:
 
         # Do not call "session.commit()" in case you write "session.begin()"
         async with session.begin():
@@ -45,6 +47,9 @@ async def object_exists(model, attr_name, attr_value, *args):
                     find_object_query = select(model).where(attr_name == attr_value or args[0][0] == args[0][1])
             else:
                 find_object_query = select(model).where(attr_name == attr_value)
+
+            # E.g. undefer() for the deferred columns which are going to be read.
+            find_object_query = find_object_query.options(*options)
             result = await session.execute(find_object_query)
             obj = result.scalar()
 
@@ -55,7 +60,7 @@ async def object_exists(model, attr_name, attr_value, *args):
 async def insert_object(model, data, call):
     request = insert(model).values(data)
 
-    async with AsyncSession(engine) as session:
+    async with get_sessionmaker()() as session:
         # Do not call "session.commit()" in case you write "session.begin()"
         async with session.begin():
             await session.execute(request)
@@ -64,7 +69,7 @@ async def insert_object(model, data, call):
 
 
 async def update_object(model, object_attr, attr_value, data, *args):
-    async with AsyncSession(engine) as session:
+    async with get_sessionmaker()() as session:
         # Do not call "session.commit()" in case you write "session.begin()"
         async with session.begin():
             request = update(model).where(object_attr==attr_value).values(data)
@@ -77,16 +82,13 @@ async def update_object(model, object_attr, attr_value, data, *args):
 async def extract_vacancies(call) -> tuple:
     chat_id = call.message.chat.id
 
-    async with AsyncSession(engine, expire_on_commit=False) as session:
+    async with get_sessionmaker()() as session:
         async with session.begin():
-            MAP = {
-                "company": 0,
-                "city": 1,
-                "foreign": 2
-            }
+            # Only columns of Vacancy are used below,
+                # so any accidental lazy load of a relationship must fail loudly.
             vacancy_list = select(Vacancy).where(
-                Vacancy.vacancy_type == MAP[call.data]
-            )
+                Vacancy.vacancy_type == VacancyType[call.data.upper()]
+            ).options(raiseload('*'))
 
             lst = await session.execute(vacancy_list)
 
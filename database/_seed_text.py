@@ -0,0 +1,23 @@
+"""The texts which are written into the database by the seed script of "database.models"."""
+# Standard library imports
+from typing import Final
+
+
+SYS_ADMIN_VACANCY_POSITION: Final[str] = "*М-Ментор на курс `Системный Администратор`*"
+
+SYS_ADMIN_VACANCY_DETAILS: Final[str] = '''Требования:
+
+    ✅ Чёткое понимание и возможность объяснить зачем нужна эта должность
+    ✅ Опыт администрирования операционных систем Linux и Windows Server
+    ✅ Английский - Pre-Intermediate | Intermediate
+    ✅ Основы стека TCP/IP
+    ✅ Умение использовать ActiveDirectory, DNS, DHCP
+    ✅ Знание и понимание протоколов (FTP, SSH, SMTP, POP3, SAMBA)
+    ✅ Знание любового скриптового ЯП
+    ✅ Навыки работы с СУБД приветствуется
+    ✅ Комерческий опыт работы от 1-2х лет
+
+
+Обязанности:
+    ⚜️ Разработка и поддержка учебного плана
+    ⚜️ Обучение студентов, проведение занятий'''
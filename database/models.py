@@ -1,20 +1,21 @@
 """The module is responsible for tables and relations betweeen them inside of the database."""
 # Standard library imports
 import datetime
+from enum import IntEnum
+from typing import List, Optional
 
 # Third party imports
 from sqlalchemy import (
-    Column, ForeignKey,
+    CheckConstraint, ForeignKey,
     Integer, String, TIMESTAMP,
     SmallInteger, BigInteger, Text
 )
-from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
+from sqlalchemy.sql import func
 from sqlalchemy.sql.elements import Null
-from sqlalchemy.sql.expression import insert
 
 # Local application imports
-from database.settings import engine
+from database.settings import get_sessionmaker
 
 from configs.constants import (
     PYTHON_INFO_TEXT_RU, PYTHON_INFO_TEXT_KG,
@@ -24,13 +25,15 @@ from configs.constants import (
     ABOUT_COMPANY_RU, ABOUT_COMPANY_KG
 )
 
-Base = declarative_base()
+
+class Base(DeclarativeBase):
+    pass
 
 
 class BaseModel(Base):
     __abstract__ = True
 
-    id = Column(
+    id: Mapped[int] = mapped_column(
         Integer,
         nullable=False,
         unique=True,
@@ -38,19 +41,19 @@ class BaseModel(Base):
         autoincrement=True
     )
 
-    created_at = Column(
+    created_at: Mapped[datetime.datetime] = mapped_column(
         TIMESTAMP,
         nullable=False,
-        # It is forbidden to leave just -> datetime.datetime.now convert it to str first!
-        server_default=str(datetime.datetime.now()),
+        # The timestamp is computed by the database at the moment of INSERT.
+        server_default=func.now(),
         comment='The date an object has been created'
     )
 
-    updated_at = Column(
+    updated_at: Mapped[datetime.datetime] = mapped_column(
         TIMESTAMP,
         nullable=False,
-        server_default=str(datetime.datetime.now()),
-        onupdate=datetime.datetime.now,
+        server_default=func.now(),
+        onupdate=func.now(),
         comment='The date an object has been updated'
     )
 
@@ -60,65 +63,66 @@ class BaseModel(Base):
 
 class Reception(BaseModel):
     __tablename__ = 'reception'
-
-    apply = Column(
-        Integer,
-        nullable=False,
-        comment='How much times the APPLY button has been pressed',
-        default=1
+    # There is only one row with the general information, so nobody can insert another one.
+    __table_args__ = (
+        CheckConstraint('id = 1', name='ck_reception_singleton'),
     )
 
-    about_courses = Column(
-        BigInteger,
+    about_company_text: Mapped[str] = mapped_column(
+        Text,
         nullable=False,
-        comment='How much times the ABOUT_COURSES button has been pressed',
-        default=1
+        comment='The general information about company'
     )
 
-    about_company = Column(
-        Integer,
-        nullable=False,
-        comment='How much times the ABOUT_COMPANY button has been pressed',
-        default=1
-    )
+    def __repr__(self):
+        return "<{0.__class__.__name__}(id={0.id!r})>".format(self)
 
-    vacancies = Column(
-        BigInteger,
-        nullable=False,
-        comment='How much times the VACANCIES button has been pressed',
-        default=1
-    )
 
-    news = Column(
-        Integer,
-        nullable=False,
-        comment='How much times the NEWS button has been pressed',
-        default=1
+class Counter(Base):
+    __tablename__ = 'counter'
+
+    # One row per button: "apply", "about_courses", "about_company", "vacancies", "news".
+    name: Mapped[str] = mapped_column(
+        String(32),
+        primary_key=True,
+        comment='The name of the button which is counted'
     )
 
-    about_company_text = Column(
-        Text,
+    value: Mapped[int] = mapped_column(
+        BigInteger,
         nullable=False,
-        comment='The general information about company'
+        server_default='0',
+        comment='How much times the button has been pressed'
     )
 
     def __repr__(self):
-        return "<{0.__class__.__name__}(id={0.id!r})>".format(self)
+        return f'{self.name} - {self.value}'
 
 
 class Department(BaseModel):
     __tablename__ = 'department'
 
-    department_name = Column(
+    # There are only a few departments, so SMALLINT is enough here and in every foreign key.
+    id: Mapped[int] = mapped_column(
+        SmallInteger,
+        nullable=False,
+        unique=True,
+        primary_key=True,
+        autoincrement=True
+    )
+
+    department_name: Mapped[str] = mapped_column(
         String,
         nullable=False,
         unique=True,
         comment='Programming language name'
     )
 
-    customers = relationship('Customer', back_populates='department')
-    courses = relationship('Course', back_populates='department')
-    news = relationship('News', back_populates='department')
+    # Collections are loaded lazily, the many-to-one sides are never loaded implicitly (lazy="raise").
+        # A query which reads a relationship has to pass selectinload(<Model>.<relationship>) to its options.
+    customers: Mapped[List["Customer"]] = relationship('Customer', back_populates='department')
+    courses: Mapped[List["Course"]] = relationship('Course', back_populates='department')
+    news: Mapped[List["News"]] = relationship('News', back_populates='department')
 
     def __repr__(self):
         return self.department_name
@@ -127,110 +131,143 @@ class Department(BaseModel):
 class Customer(BaseModel):
     __tablename__ = 'customer'
 
-    chat_id = Column(
-        Integer,
+    chat_id: Mapped[int] = mapped_column(
+        BigInteger,
         nullable=False,
+        index=True,
         comment='The chat id of User who applied for registration'
     )
 
-    first_name = Column(
+    first_name: Mapped[str] = mapped_column(
         String,
         nullable=False,
         comment='How much times the apply button has been pressed'
     )
 
-    last_name = Column(
+    last_name: Mapped[Optional[str]] = mapped_column(
         String,
         nullable=True,
         comment='How much times the apply button has been pressed'
     )
 
-    phone = Column(
+    phone: Mapped[Optional[int]] = mapped_column(
         BigInteger,
         nullable=True,
         comment='How much times the apply button has been pressed'
     )
 
-    time = Column(
+    time: Mapped[Optional[int]] = mapped_column(
         SmallInteger,
         nullable=True,
         comment='The time when a group start to study. Morning or Evening'
     )
 
-    department_name = Column(
-        String,
-        ForeignKey('department.department_name'),
-        nullable=False
+    department_id: Mapped[int] = mapped_column(
+        SmallInteger,
+        ForeignKey('department.id'),
+        nullable=False,
+        index=True
     )
 
-    department = relationship(
+    department: Mapped["Department"] = relationship(
         "Department",
-        back_populates="customers"
+        back_populates="customers",
+        # Handlers take the department from the in-process cache (configs.subfunctions.DEPARTMENTS).
+        lazy="raise"
     )
 
     def __repr__(self):
-        return f'{self.department_name} | {self.first_name} | {self.last_name}'
+        return f'{self.department_id} | {self.first_name} | {self.last_name}'
 
 
 class Course(BaseModel):
     __tablename__ = 'course'
 
-    department_id = Column(
-        Integer,
+    # Each department has only one course description.
+    department_id: Mapped[int] = mapped_column(
+        SmallInteger,
         ForeignKey('department.id'),
-        nullable=False
+        nullable=False,
+        unique=True,
+        index=True
     )
 
-    department = relationship(
+    department: Mapped["Department"] = relationship(
         "Department",
-        back_populates="courses"
+        back_populates="courses",
+        lazy="raise"
     )
 
-    department_info = Column(
+    # Large Text columns (this one, Vacancy.details, VacancyApplicants.cover_letter) are deferred:
+        # they are loaded only when accessed or when undefer() is passed to the query options.
+    department_info: Mapped[str] = mapped_column(
         Text,
         nullable=False,
-        comment='The information about course'
+        comment='The information about course',
+        deferred=True
     )
 
     def __repr__(self):
+        # __repr__ shows only the row's own columns, so printing a Course or News never triggers a query.
+            # The text with the department is in describe(), call it only when "department" is loaded by selectinload().
+        return f'<Course id={self.id} dept={self.department_id}>'
+
+    def describe(self):
         return f'{self.department}'
 
 
+class VacancyType(IntEnum):
+    # The vacancy provided by P-Programist
+    COMPANY = 0
+    # The vacancy provided by another resource inside of the city
+    CITY = 1
+    # The vacancy provided by a foreign resource
+    FOREIGN = 2
+
+
 class Vacancy(BaseModel):
     __tablename__ = 'vacancy'
+    __table_args__ = (
+        CheckConstraint(
+            'vacancy_type IN ({})'.format(', '.join(str(int(item)) for item in VacancyType)),
+            name='ck_vacancy_type'
+        ),
+    )
 
-    vacancy_type = Column(
+    vacancy_type: Mapped[int] = mapped_column(
         SmallInteger,
         nullable=False,
-        comment='If VACANCY_TYPE = 0 it means that vacancy provided by P-Programist, otherwise the vacancy provided by another resource'
+        index=True,
+        comment='One of VacancyType values: 0 - provided by P-Programist, 1 - by a local resource, 2 - by a foreign one'
     )
 
-    position = Column(
+    position: Mapped[str] = mapped_column(
         String,
         nullable=False,
         comment='The header of vacancy'
     )
 
-    time = Column(
+    time: Mapped[str] = mapped_column(
         String,
         nullable=False,
         comment='The time of lesson'
     )
 
-    salary = Column(
+    salary: Mapped[str] = mapped_column(
         String,
         nullable=False,
         comment='The salary of a mentor'
     )
 
-    details = Column(
+    details: Mapped[str] = mapped_column(
         Text,
         nullable=False,
-        comment='These are the details of vacancy'
+        comment='These are the details of vacancy',
+        deferred=True
     )
 
     # This line is binded with the VACANCY field in VacancyApplicants class.
-    applicants = relationship('VacancyApplicants', back_populates='vacancy')
+    applicants: Mapped[List["VacancyApplicants"]] = relationship('VacancyApplicants', back_populates='vacancy')
 
     def __repr__(self):
         return f'{self.position}'
@@ -239,42 +276,46 @@ class Vacancy(BaseModel):
 class VacancyApplicants(BaseModel):
     __tablename__ = 'vacancy_applicants'
 
-    vacancy_id = Column(
+    vacancy_id: Mapped[int] = mapped_column(
         Integer,
         ForeignKey('vacancy.id'),
-        nullable=False
+        nullable=False,
+        index=True
     )
 
-    vacancy = relationship(
+    vacancy: Mapped["Vacancy"] = relationship(
         "Vacancy",
-        back_populates="applicants"
+        back_populates="applicants",
+        lazy="raise"
     )
 
-    chat_id = Column(
-        Integer,
+    chat_id: Mapped[int] = mapped_column(
+        BigInteger,
         nullable=False,
+        index=True,
         comment='The chat id of User who applied for vacancy'
     )
 
-    full_name = Column(
+    full_name: Mapped[Optional[str]] = mapped_column(
         String,
         nullable=True,
         comment='The full name of applicant'
     )
 
-    cover_letter = Column(
+    cover_letter: Mapped[Optional[str]] = mapped_column(
         Text,
         nullable=True,
-        comment='This cover letter has to be written in order to see applicants\'s interests'
+        comment='This cover letter has to be written in order to see applicants\'s interests',
+        deferred=True
     )
 
-    github_link = Column(
+    github_link: Mapped[Optional[str]] = mapped_column(
         String,
         nullable=True,
         comment='A GitHub link to check applicant\'s experience'
     )
 
-    phone_number = Column(
+    phone_number: Mapped[Optional[int]] = mapped_column(
         BigInteger,
         nullable=True,
         comment='The contact number of applicant'
@@ -287,63 +328,68 @@ class VacancyApplicants(BaseModel):
 class News(BaseModel):
     __tablename__ = 'news'
 
-    department_id = Column(
-        Integer,
+    department_id: Mapped[int] = mapped_column(
+        SmallInteger,
         ForeignKey('department.id'),
-        nullable=False
+        nullable=False,
+        index=True
     )
 
-    department = relationship(
+    department: Mapped["Department"] = relationship(
         "Department",
-        back_populates="news"
+        back_populates="news",
+        lazy="raise"
     )
 
-    news_source = Column(
+    news_source: Mapped[str] = mapped_column(
         String,
         nullable=False,
         comment='The source where the statistic has been taken from'
     )
 
-    news_label = Column(
+    news_label: Mapped[str] = mapped_column(
         String,
         nullable=False,
         comment='The header of an article'
     )
 
     def __repr__(self):
+        return f'<News id={self.id} dept={self.department_id} label={self.news_label!r}>'
+
+    def describe(self):
         return f'{self.department.department_name} - {self.news_label}'
 
 class Feedback(BaseModel):
     __tablename__ = 'Feedback'
 
-    telegram_id = Column(
-        Integer,
+    telegram_id: Mapped[int] = mapped_column(
+        BigInteger,
         nullable=False
     )
 
-    department_id = Column(
-        Integer,
+    department_id: Mapped[int] = mapped_column(
+        SmallInteger,
         nullable=False
     )
 
-    groups = Column(
+    groups: Mapped[int] = mapped_column(
         Integer,
         nullable=False
     )
 
-    first_name = Column(
+    first_name: Mapped[Optional[str]] = mapped_column(
         String,
         nullable=True,
         default= Null
     )
 
-    last_name = Column(
+    last_name: Mapped[Optional[str]] = mapped_column(
         String,
         nullable=True,
         default= Null
     )
 
-    feedback = Column(
+    feedback: Mapped[str] = mapped_column(
         String,
         nullable=False
     )
@@ -353,92 +399,127 @@ class Feedback(BaseModel):
 
 
 if __name__ == "__main__":
+    import argparse
     import asyncio
-    from sqlalchemy.ext.asyncio import AsyncSession
+    from sqlalchemy.dialects.postgresql import insert as pg_insert
+    from sqlalchemy import text
+    from sqlalchemy.future import select
+
+    from database._seed_text import SYS_ADMIN_VACANCY_POSITION, SYS_ADMIN_VACANCY_DETAILS
+
+    # Starting from this amount of rows it is cheaper to stream them
+        # through the asyncpg COPY protocol than to bind them into INSERT.
+    COPY_THRESHOLD = 100
 
-    async def recreate_database():
+    # The statement is built once, the rows are attached to it by "bulk_insert".
+    _COURSE_INSERT = pg_insert(Course).on_conflict_do_nothing(index_elements=["department_id"])
+
+    async def bulk_insert(session, model, rows, request):
+        '''
+            Inserts many rows of the same shape into the table of the model.
+            "request" is an INSERT of the model which decides what to do with rows which already exist.
+            COPY is not able to skip conflicting rows,
+            so it is used only for big batches going into an empty table.
+        '''
+        if len(rows) >= COPY_THRESHOLD:
+            table_is_empty = await session.scalar(select(model.id).limit(1)) is None
+        else:
+            table_is_empty = False
+
+        if table_is_empty:
+            connection = await session.connection()
+            raw = await connection.get_raw_connection()
+            columns = list(rows[0])
+
+            await raw.driver_connection.copy_records_to_table(
+                model.__tablename__,
+                records=[tuple(row[column] for column in columns) for row in rows],
+                columns=columns
+            )
+        else:
+            # The rows go into one multi-row VALUES statement. Executing "request" with a list of
+                # parameters would be a plain executemany instead, asyncpg does not batch INSERT without RETURNING.
+            await session.execute(request.values(rows))
+
+    async def recreate_database(recreate=False):
         '''
-            When you want to set a connection with the database,
-            You have to call the .begin() method from engine.
-            After this method initialized You will get asynchronous connection with database.
+            The tables and all the seed data are written in one transaction,
+            so either everything is created or nothing at all.
+            Tables are dropped only if "recreate" is passed, otherwise the missing ones are created
+            and the seed data is inserted only where it is absent, so it is safe to run many times.
+            Do not call "session.commit()" here, the context manager commits the transaction.
         '''
-        async with engine.begin() as connection:
-            await connection.run_sync(Base.metadata.drop_all)
+        async with get_sessionmaker()() as session, session.begin():
+            connection = await session.connection()
+
+            if recreate:
+                await connection.run_sync(Base.metadata.drop_all)
             await connection.run_sync(Base.metadata.create_all)
 
-        async with AsyncSession(engine, expire_on_commit=False) as session:
-            async with session.begin():
-                python = Department(id=1, department_name='Python')
-                sys_admin = Department(
-                    id=2, department_name='System Administrator')
-                javascript = Department(id=3, department_name='Javascript')
-                java = Department(id=4, department_name='Java')
-                about = Reception(
-                    apply=0, about_courses=0,
-                    about_company=0, vacancies=0,
-                    news=0, about_company_text=ABOUT_COMPANY_RU
-                )
-                session.add_all(
-                    [about,
-                        python,
-                        sys_admin,
-                        javascript,
-                        java
-                     ]
-                )
-
-            python_info = insert(Course).values(
+            departments = [
+                {"id": 1, "department_name": 'Python'},
+                {"id": 2, "department_name": 'System Administrator'},
+                {"id": 3, "department_name": 'Javascript'},
+                {"id": 4, "department_name": 'Java'},
+            ]
+            python, sys_admin, javascript, java = departments
+
+            # Every department is inserted by one multi-row VALUES statement.
+            await session.execute(
+                pg_insert(Department).values(departments)
+                .on_conflict_do_nothing(index_elements=["department_name"])
+            )
+            # The ids above are explicit, so the sequence has to be moved past them,
+                # otherwise the next department without an id would get a duplicate one.
+            await session.execute(
+                text("SELECT setval(pg_get_serial_sequence('department', 'id'), (SELECT max(id) FROM department))")
+            )
+            await session.execute(
+                pg_insert(Reception).values(
+                    id=1, about_company_text=ABOUT_COMPANY_RU
+                ).on_conflict_do_nothing(index_elements=["id"])
+            )
+
+            # All courses are inserted at once, see "bulk_insert" above.
+            courses = [
                 {
                     "department_info": PYTHON_INFO_TEXT_RU,
-                    "department_id": python.id
-                }
-            )
-            sys_admin_info = insert(Course).values(
+                    "department_id": python["id"]
+                },
                 {
                     "department_info": SYS_ADMIN_INFO_TEXT_RU,
-                    "department_id": sys_admin.id
-                }
-            )
-            javascript_info = insert(Course).values(
+                    "department_id": sys_admin["id"]
+                },
                 {
                     "department_info": JAVASCRIPT_INFO_TEXT_RU,
-                    "department_id": javascript.id
-                }
-            )
+                    "department_id": javascript["id"]
+                },
+            ]
 
-            sys_admin_vacancy = insert(Vacancy).values(
+            sys_admin_vacancy = pg_insert(Vacancy).values(
                 {
-                    "vacancy_type": 0,
-                    "position": "*М-Ментор на курс `Системный Администратор`*",
+                    "vacancy_type": VacancyType.COMPANY,
+                    "position": SYS_ADMIN_VACANCY_POSITION,
                     "time": "Договорный",
                     "salary": "*350 - 450 $*",
-                    "details": '''Требования:
-
-    ✅ Чёткое понимание и возможность объяснить зачем нужна эта должность
-    ✅ Опыт администрирования операционных систем Linux и Windows Server
-    ✅ Английский - Pre-Intermediate | Intermediate
-    ✅ Основы стека TCP/IP
-    ✅ Умение использовать ActiveDirectory, DNS, DHCP
-    ✅ Знание и понимание протоколов (FTP, SSH, SMTP, POP3, SAMBA)
-    ✅ Знание любового скриптового ЯП
-    ✅ Навыки работы с СУБД приветствуется
-    ✅ Комерческий опыт работы от 1-2х лет
-
-
-Обязанности:
-    ⚜️ Разработка и поддержка учебного плана
-    ⚜️ Обучение студентов, проведение занятий'''
+                    "details": SYS_ADMIN_VACANCY_DETAILS
                 }
             )
 
-            await session.execute(python_info)
-            await session.execute(sys_admin_info)
-            await session.execute(javascript_info)
-            await session.execute(sys_admin_vacancy)
-            await session.commit()
-
-    asyncio.run(recreate_database())
-
+            await bulk_insert(session, Course, courses, _COURSE_INSERT)
 
+            # Vacancy has no natural unique key, so the sample one is inserted only if it is absent.
+            sys_admin_vacancy_id = await session.scalar(
+                select(Vacancy.id).where(Vacancy.position == SYS_ADMIN_VACANCY_POSITION).limit(1)
+            )
+            if sys_admin_vacancy_id is None:
+                await session.execute(sys_admin_vacancy)
 
+    parser = argparse.ArgumentParser(description='Creates the tables and fills them with initial data.')
+    parser.add_argument(
+        '--recreate',
+        action='store_true',
+        help='Drop every table before creating it again. All the data will be lost!'
+    )
 
+    asyncio.run(recreate_database(parser.parse_args().recreate))
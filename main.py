@@ -5,6 +5,7 @@ from aiogram import executor
 from aiogram.bot import Bot
 from aiogram.dispatcher import Dispatcher
 from aiogram.types import Message, CallbackQuery, ParseMode, message
+from sqlalchemy.orm import undefer
 import asyncio
 import uvloop
 
@@ -19,13 +20,12 @@ from buttons.inlines_buttons import (
     Group_time_fb,
 )
 from buttons.text_buttons import ConfirmNumber
-from configs import constants, states, subfunctions
+from configs import constants, counters, states, subfunctions
 from configs.core import redworker, storage
 from database.models import (
     Course,
     Customer,
     Reception,
-    Department,
     Vacancy,
     VacancyApplicants,
 )
@@ -99,7 +99,7 @@ async def reception(call: CallbackQuery):
     lang = await redworker.get_data(chat=chat_id)
 
     if call.data:
-        await subfunctions.increment_at_reception(Reception, call)
+        await counters.increment(call.data)
 
         if call.data == "apply":
             await call.message.edit_text(
@@ -191,7 +191,8 @@ async def set_time_for_course(call: CallbackQuery):
         if user:
             if user.phone:
                 # If we find the User in database - that means he already applied for the last 3 days
-                f_name, dp_name = user.first_name, user.department_name
+                department = subfunctions.DEPARTMENTS[user.department_id]
+                f_name, dp_name = user.first_name, department.department_name
 
                 await call.message.edit_text(
                     text=constants.SPEECH["already_applied" + lang]
@@ -224,13 +225,25 @@ async def set_time_for_course(call: CallbackQuery):
             """
             department_name = " ".join(call.data.split("_")).title()
 
+            dp = subfunctions.department_by_name(department_name)
+
+            # The button may belong to a department which is not in the database yet
+            if dp is None:
+                await call.message.edit_text(
+                    text=constants.SPEECH["course_under_development" + lang],
+                    reply_markup=await MainMenu(chat_id).main_menu_buttons(),
+                    parse_mode=ParseMode.MARKDOWN,
+                )
+
+                return await states.BotStates.main_menu.set()
+
             data = {
                 "chat_id": chat_id,
                 "first_name": call.from_user.first_name,
                 "last_name": call.from_user.last_name
                 if call.from_user.last_name is not None
                 else "Unknown",
-                "department_name": department_name,
+                "department_id": dp.id,
             }
 
             await subfunctions.insert_object(Customer, data, call)
@@ -356,21 +369,21 @@ async def send_information_about_course(call: CallbackQuery):
         return await states.BotStates.know_about_corses.set()
 
     if call.data:
-        # Get an attrubute of Department model
-        dp_field = getattr(Department, "department_name")
-
         # Edit callback_data into database value
         dp_name = " ".join(call.data.split("_")).title()
 
-        # Retrieve department object from database by "department_name"
-        dp = await subfunctions.object_exists(Department, dp_field, dp_name)
+        # Retrieve department object from the cache by "department_name"
+        dp = subfunctions.department_by_name(dp_name)
 
         # Get an attrubute of Course model
         course_field = getattr(Course, "department_id")
 
-        # Here might be an ERROR in case if database will be empty
         # Retrieve course object from database by "department_id"
-        course = await subfunctions.object_exists(Course, course_field, dp.id)
+        # "department_info" is deferred, so it has to be loaded explicitly
+        # An unknown department has no course either
+        course = await subfunctions.object_exists(
+            Course, course_field, dp.id, options=[undefer(Course.department_info)]
+        ) if dp else []
 
         if not course:
             await call.message.edit_text(
@@ -685,5 +698,26 @@ async def ask_github_link_for_vacancy(message: Message):
     )
     return await states.BotStates.main_menu.set()
     
+async def on_startup(dispatcher: Dispatcher):
+    # Departments never change while the bot is running, so they are read only once.
+    await subfunctions.load_departments()
+
+    # Clicks are collected in Redis and written into the database in the background.
+    counters.flush_task = loop.create_task(counters.flush_periodically())
+
+
+async def on_shutdown(dispatcher: Dispatcher):
+    # Stop the periodic flush first, the last flush waits until a running one is finished.
+    counters.flush_task.cancel()
+    try:
+        await counters.flush_task
+    except asyncio.CancelledError:
+        pass
+
+    await counters.flush()
+
+
 if __name__ == "__main__":
-    executor.start_polling(dispatcher=dp, loop=loop)
+    executor.start_polling(
+        dispatcher=dp, loop=loop, on_startup=on_startup, on_shutdown=on_shutdown
+    )
@@ -0,0 +1,27 @@
+import sys
+import types
+
+import configs
+
+
+# "configs/constants.py" keeps the secrets and is not in the repository,
+    # so the tests use a stub with the same names when it is missing.
+try:
+    import configs.constants
+except ModuleNotFoundError:
+    constants = types.ModuleType('configs.constants')
+
+    constants.POSTGRESQL_USERNAME = 'postgres'
+    constants.POSTGRESQL_PASSWORD = 'postgres'
+    constants.REDIS_PASSWORD = None
+    constants.PPROGRAMISTBOT_TOKEN = ''
+    constants.SPEECH = {}
+
+    for name in ('PYTHON', 'SYS_ADMIN', 'JAVASCRIPT', 'JAVA'):
+        setattr(constants, f'{name}_INFO_TEXT_RU', '')
+        setattr(constants, f'{name}_INFO_TEXT_KG', '')
+    constants.ABOUT_COMPANY_RU = ''
+    constants.ABOUT_COMPANY_KG = ''
+
+    sys.modules['configs.constants'] = constants
+    configs.constants = constants
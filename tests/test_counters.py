@@ -0,0 +1,155 @@
+import asyncio
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from configs import counters
+
+
+class FakeRedis:
+    """Keeps hashes in a dict and answers like redis.asyncio.Redis does."""
+    def __init__(self):
+        self.data = {}
+
+    async def exists(self, key):
+        return int(key in self.data)
+
+    async def rename(self, source, destination):
+        self.data[destination] = self.data.pop(source)
+
+    async def hgetall(self, key):
+        return dict(self.data.get(key, {}))
+
+    async def delete(self, key):
+        self.data.pop(key, None)
+
+    async def hincrby(self, key, field, amount):
+        fields = self.data.setdefault(key, {})
+        fields[field.encode()] = str(int(fields.get(field.encode(), b'0')) + amount).encode()
+
+
+class FakeSession:
+    """Records executed statements, fails on execute() if "error" is passed."""
+    def __init__(self, error=None):
+        self.error = error
+        self.executed = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        return False
+
+    def begin(self):
+        return self
+
+    async def execute(self, request):
+        # Lets another coroutine run in the middle of the database write.
+        await asyncio.sleep(0)
+        if self.error:
+            raise self.error
+        self.executed.append(request)
+
+
+@pytest.fixture
+def redis(monkeypatch):
+    fake = FakeRedis()
+    monkeypatch.setattr(counters, 'counter', fake)
+    # Every test runs its own event loop, so it needs its own lock.
+    monkeypatch.setattr(counters, '_flush_lock', asyncio.Lock())
+    return fake
+
+
+def use_session(monkeypatch, session):
+    monkeypatch.setattr(counters, 'get_sessionmaker', lambda: lambda: session)
+
+
+def written_counters(request):
+    params = request.compile(dialect=postgresql.dialect()).params
+    return {
+        params[key]: params[key.replace('name', 'value')]
+        for key in params if key.startswith('name')
+    }
+
+
+def test_increment_counts_only_known_buttons(redis):
+    asyncio.run(counters.increment('apply'))
+    asyncio.run(counters.increment('apply'))
+    asyncio.run(counters.increment('back_to_menu'))
+
+    assert redis.data == {counters.REDIS_KEY: {b'apply': b'2'}}
+
+
+def test_flush_without_clicks_does_not_touch_database(redis, monkeypatch):
+    session = FakeSession()
+    use_session(monkeypatch, session)
+
+    asyncio.run(counters.flush())
+
+    assert session.executed == []
+
+
+def test_flush_writes_decoded_deltas_and_clears_them(redis, monkeypatch):
+    session = FakeSession()
+    use_session(monkeypatch, session)
+    redis.data[counters.REDIS_KEY] = {b'apply': b'3', b'news': b'1'}
+
+    asyncio.run(counters.flush())
+
+    assert len(session.executed) == 1
+    assert written_counters(session.executed[0]) == {'apply': 3, 'news': 1}
+    assert redis.data == {}
+
+
+def test_failed_flush_keeps_clicks_for_the_next_one(redis, monkeypatch):
+    use_session(monkeypatch, FakeSession(error=ConnectionError()))
+    redis.data[counters.REDIS_KEY] = {b'apply': b'3'}
+
+    with pytest.raises(ConnectionError):
+        asyncio.run(counters.flush())
+
+    assert redis.data == {counters.FLUSHING_KEY: {b'apply': b'3'}}
+
+    # The clicks made in between wait in a new hash until the old ones are written.
+    asyncio.run(counters.increment('news'))
+    session = FakeSession()
+    use_session(monkeypatch, session)
+
+    asyncio.run(counters.flush())
+
+    assert written_counters(session.executed[0]) == {'apply': 3}
+    assert redis.data == {counters.REDIS_KEY: {b'news': b'1'}}
+
+
+def test_overlapping_flushes_write_clicks_once(redis, monkeypatch):
+    session = FakeSession()
+    use_session(monkeypatch, session)
+    redis.data[counters.REDIS_KEY] = {b'apply': b'3'}
+
+    async def flush_twice():
+        await asyncio.gather(counters.flush(), counters.flush())
+
+    asyncio.run(flush_twice())
+
+    assert len(session.executed) == 1
+    assert written_counters(session.executed[0]) == {'apply': 3}
+    assert redis.data == {}
+
+
+def test_flush_periodically_survives_a_failed_flush(monkeypatch):
+    calls = []
+
+    async def flush():
+        calls.append(1)
+        if len(calls) == 1:
+            raise ConnectionError()
+        # Stops the endless loop
+        raise asyncio.CancelledError()
+
+    monkeypatch.setattr(counters, 'FLUSH_INTERVAL', 0)
+    monkeypatch.setattr(counters, 'flush', flush)
+
+    with pytest.raises(asyncio.CancelledError):
+        asyncio.run(counters.flush_periodically())
+
+    assert len(calls) == 2
@@ -0,0 +1,21 @@
+import pytest
+
+from database.models import Vacancy, VacancyType
+
+
+@pytest.mark.parametrize('callback_data, vacancy_type', [
+    ('company', 0),
+    ('city', 1),
+    ('foreign', 2),
+])
+def test_vacancy_buttons_map_to_vacancy_type(callback_data, vacancy_type):
+    # extract_vacancies() maps the callback data of the vacancy buttons this way
+    assert VacancyType[callback_data.upper()] == vacancy_type
+
+
+def test_vacancy_type_check_allows_every_vacancy_type():
+    constraint, = [
+        item for item in Vacancy.__table__.constraints if item.name == 'ck_vacancy_type'
+    ]
+
+    assert str(constraint.sqltext) == 'vacancy_type IN (0, 1, 2)'
@@ -0,0 +1,69 @@
+import asyncio
+
+import pytest
+
+from configs import subfunctions
+from database.models import Department
+
+
+class FakeResult:
+    def __init__(self, objects):
+        self.objects = objects
+
+    def scalars(self):
+        return iter(self.objects)
+
+
+class FakeSession:
+    def __init__(self, objects):
+        self.result = FakeResult(objects)
+        self.executed = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        return False
+
+    def begin(self):
+        return self
+
+    async def execute(self, request):
+        self.executed.append(request)
+        return self.result
+
+
+@pytest.fixture
+def departments(monkeypatch):
+    session = FakeSession([
+        Department(id=1, department_name='Python'),
+        Department(id=2, department_name='System Administrator'),
+    ])
+    monkeypatch.setattr(subfunctions, 'get_sessionmaker', lambda: lambda: session)
+    monkeypatch.setattr(subfunctions, 'DEPARTMENTS', {})
+
+    asyncio.run(subfunctions.load_departments())
+
+    return session
+
+
+def test_load_departments_fills_cache_by_id(departments):
+    assert len(departments.executed) == 1
+    assert sorted(subfunctions.DEPARTMENTS) == [1, 2]
+    assert subfunctions.DEPARTMENTS[2].department_name == 'System Administrator'
+
+
+def test_load_departments_replaces_old_cache(departments):
+    subfunctions.DEPARTMENTS[99] = Department(id=99, department_name='Removed')
+
+    asyncio.run(subfunctions.load_departments())
+
+    assert sorted(subfunctions.DEPARTMENTS) == [1, 2]
+
+
+def test_department_by_name(departments):
+    assert subfunctions.department_by_name('Python').id == 1
+
+
+def test_department_by_name_returns_none_for_unknown_department(departments):
+    assert subfunctions.department_by_name('Cobol') is None